@@ -23,6 +23,13 @@ class Settings:
     # Database Configuration - DynamoDB
     DYNAMODB_TABLE_NAME: str = os.getenv("DYNAMODB_TABLE_NAME", "document")
     DYNAMODB_REGION: str = os.getenv("DYNAMODB_REGION", "us-east-1")
+    DYNAMODB_CHANGE_FEED_INDEX: str = os.getenv("DYNAMODB_CHANGE_FEED_INDEX", "feed-sequence-index")
+    # Changes younger than this are held back so a slower concurrent write is less likely to be skipped
+    CHANGE_FEED_SETTLE_SECONDS: float = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", 15.0))
+    # Client-side write limits; their worst case, retries included, must stay below the settle window
+    DYNAMODB_WRITE_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("DYNAMODB_WRITE_CONNECT_TIMEOUT_SECONDS", 1.0))
+    DYNAMODB_WRITE_READ_TIMEOUT_SECONDS: float = float(os.getenv("DYNAMODB_WRITE_READ_TIMEOUT_SECONDS", 2.0))
+    DYNAMODB_WRITE_MAX_ATTEMPTS: int = int(os.getenv("DYNAMODB_WRITE_MAX_ATTEMPTS", 3))
 
     # AWS Credentials (LocalStack/local development)
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID", "test")
@@ -36,6 +43,30 @@ class Settings:
 
     # Health Check Configuration
     HEALTH_CHECK_ENDPOINT: str = os.getenv("HEALTH_CHECK_ENDPOINT", "/health")
+    READINESS_CHECK_ENDPOINT: str = os.getenv("READINESS_CHECK_ENDPOINT", "/ready")
+
+    # Admission Control Configuration
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true"
+    # Bulk listing walks every object in S3, so it gets a small budget of its own
+    DOCUMENT_LIST_MAX_CONCURRENCY: int = int(os.getenv("DOCUMENT_LIST_MAX_CONCURRENCY", 2))
+    DOCUMENT_LIST_MAX_QUEUE: int = int(os.getenv("DOCUMENT_LIST_MAX_QUEUE", 4))
+    # Every other route gets its own limiter sized with these defaults
+    DEFAULT_ROUTE_MAX_CONCURRENCY: int = int(os.getenv("DEFAULT_ROUTE_MAX_CONCURRENCY", 16))
+    DEFAULT_ROUTE_MAX_QUEUE: int = int(os.getenv("DEFAULT_ROUTE_MAX_QUEUE", 32))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2.0))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
+
+    # Request Timing and Profiling Configuration
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "True").lower() == "true"
+    # Fraction of requests profiled automatically, 0.0 disables sampling
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+    # When enabled, a request sending PROFILING_HEADER: true is always profiled.
+    # Any client can send it, so only enable this behind a trusted proxy that strips it
+    PROFILING_HEADER_ENABLED: bool = os.getenv("PROFILING_HEADER_ENABLED", "False").lower() == "true"
+    PROFILING_HEADER: str = os.getenv("PROFILING_HEADER", "X-Profile")
+    PROFILING_OUTPUT_DIR: str = os.getenv("PROFILING_OUTPUT_DIR", "/tmp/document-service-profiles")
+    # Oldest profiles are deleted once the directory holds more than this many
+    PROFILING_MAX_FILES: int = int(os.getenv("PROFILING_MAX_FILES", 50))
 
 
 # Create a single instance to import anywhere
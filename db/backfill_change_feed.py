@@ -0,0 +1,17 @@
+"""
+One-off backfill that adds existing documents to the change feed.
+
+Run once after deploying the change feed:
+    python -m db.backfill_change_feed
+"""
+from db.dynamodb import DynamoDBDocumentStorage
+
+
+def main():
+    storage = DynamoDBDocumentStorage()
+    stamped = storage.backfill_change_feed()
+    print(f"Backfilled {stamped} documents into the change feed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
 import boto3
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from modules.module import Document
+from modules.module import Document, DocumentChange, DocumentChangesPage
 from config import settings
+from db.single_flight import SingleFlight
+from timing import timed
+
+# Every live document and tombstone shares this partition in the change feed index
+CHANGE_FEED_PARTITION = "documents"
+# Item holding the atomic counter that hands out change sequence numbers
+SEQUENCE_COUNTER_ID = "__change_sequence__"
+
+
+def write_deadline_seconds(connect_timeout: float, read_timeout: float, max_attempts: int) -> float:
+    """
+    Rough worst-case client time for a write to finish or fail, retries included.
+    botocore's standard retry mode waits at most 2 ** n seconds before retry n.
+    read_timeout limits each socket read rather than the whole request, so this is an estimate.
+    """
+    backoff = sum(2 ** retry for retry in range(max_attempts - 1))
+    return max_attempts * (connect_timeout + read_timeout) + backoff
 
 
 class DynamoDBDocumentStorage:
 
-    def __init__(self):
+    def __init__(self, auto_create_index: bool = True):
         """Initialize the DynamoDBDocumentStorage."""
         self.dynamodb = boto3.resource('dynamodb', 
             endpoint_url=settings.LOCALSTACK_ENDPOINT_URL, 
@@ -17,23 +37,119 @@ class DynamoDBDocumentStorage:
         )
         self.table = self.dynamodb.Table('document')
 
+        # Writes stamp updated_at before they land, so they get a client whose estimated
+        # worst case fits inside the settle window. This is best effort: see get_changes
+        deadline = write_deadline_seconds(
+            settings.DYNAMODB_WRITE_CONNECT_TIMEOUT_SECONDS,
+            settings.DYNAMODB_WRITE_READ_TIMEOUT_SECONDS,
+            settings.DYNAMODB_WRITE_MAX_ATTEMPTS
+        )
+        if deadline >= settings.CHANGE_FEED_SETTLE_SECONDS:
+            raise ValueError(
+                f"DynamoDB writes can take up to {deadline}s, which must be below "
+                f"CHANGE_FEED_SETTLE_SECONDS ({settings.CHANGE_FEED_SETTLE_SECONDS}s)"
+            )
+        self.write_table = boto3.resource('dynamodb',
+            endpoint_url=settings.LOCALSTACK_ENDPOINT_URL,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            config=Config(
+                connect_timeout=settings.DYNAMODB_WRITE_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=settings.DYNAMODB_WRITE_READ_TIMEOUT_SECONDS,
+                retries={'max_attempts': settings.DYNAMODB_WRITE_MAX_ATTEMPTS, 'mode': 'standard'}
+            ),
+        ).Table('document')
+        self.read_flight = SingleFlight()
+        self.change_feed_index = settings.DYNAMODB_CHANGE_FEED_INDEX
+
+        # Auto-create the change feed index if it doesn't exist
+        if auto_create_index:
+            self.ensure_change_feed_index()
+
+    def ensure_change_feed_index(self) -> bool:
+        """
+        Ensure the time-ordered change feed index exists. Create it if it doesn't.
+        The index is sparse: only items carrying a feed attribute are projected.
+        """
+        try:
+            client = self.dynamodb.meta.client
+            table = client.describe_table(TableName=self.table.name)['Table']
+            index_names = [index['IndexName'] for index in table.get('GlobalSecondaryIndexes', [])]
+            if self.change_feed_index in index_names:
+                return True
+
+            create_index = {
+                'IndexName': self.change_feed_index,
+                'KeySchema': [
+                    {'AttributeName': 'feed', 'KeyType': 'HASH'},
+                    {'AttributeName': 'sequence', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            }
+            billing_mode = table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED')
+            if billing_mode == 'PROVISIONED':
+                create_index['ProvisionedThroughput'] = {
+                    'ReadCapacityUnits': 5,
+                    'WriteCapacityUnits': 5,
+                }
+
+            client.update_table(
+                TableName=self.table.name,
+                AttributeDefinitions=[
+                    {'AttributeName': 'feed', 'AttributeType': 'S'},
+                    {'AttributeName': 'sequence', 'AttributeType': 'N'},
+                ],
+                GlobalSecondaryIndexUpdates=[{'Create': create_index}],
+            )
+            return True
+        except Exception as e:
+            print(f"Failed to create change feed index: {e}")
+            return False
+
+    def next_change(self) -> dict:
+        """
+        Allocate the next change sequence number and timestamp.
+        The counter is bumped atomically, so sequences never repeat.
+        """
+        result = self.write_table.update_item(
+            Key={"doc_id": SEQUENCE_COUNTER_ID},
+            UpdateExpression="ADD #seq :one",
+            ExpressionAttributeNames={"#seq": "sequence"},
+            ExpressionAttributeValues={":one": 1},
+            ReturnValues="UPDATED_NEW"
+        )
+        return {
+            "sequence": int(result["Attributes"]["sequence"]),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "feed": CHANGE_FEED_PARTITION,
+        }
+
+    @timed("dynamodb")
     def create_document(self, document: Document) -> Document:
         """Create a new document."""
         try:
+            change = self.next_change()
+            document.sequence = change["sequence"]
+            document.updated_at = change["updated_at"]
             print(f"pydantic object{document}")
             print(f"document : == {document.model_dump()}")
-            self.table.put_item(Item=document.model_dump())
+            self.write_table.put_item(Item={**document.model_dump(), "feed": change["feed"]})
+            self.read_flight.forget(document.doc_id)
             return document
         except ClientError as e:
             raise e
 
 
+    @timed("dynamodb")
     def get_all_documents(self) -> List[Document]:
         """Return a list of all documents."""
         try:
             response = self.table.scan()
             documents = []
             for item in response['Items']:
+                # Skip tombstones and the sequence counter
+                if item.get("deleted") or item["doc_id"] == SEQUENCE_COUNTER_ID:
+                    continue
                 # Convert DynamoDB item to Document object
                 # Use model_validate to handle field mapping properly
                 document = Document.model_validate(item)
@@ -43,13 +159,21 @@ class DynamoDBDocumentStorage:
             raise e
     
         
+    @timed("dynamodb")
     def get_document_by_id(self, doc_id) -> Document | None:
+        """
+        Return a document by its ID, or None if not found.
+        Concurrent lookups for the same ID share one get_item call.
+        """
+        return self.read_flight.do(doc_id, lambda: self._get_document_by_id(doc_id))
+
+    def _get_document_by_id(self, doc_id) -> Document | None:
         try:
             # Try to get from DynamoDB
             response = self.table.get_item(Key={"doc_id": doc_id})
             item = response.get("Item")
             
-            if item:
+            if item and not item.get("deleted") and doc_id != SEQUENCE_COUNTER_ID:
                 # Convert DynamoDB item to Document object
                 return Document.model_validate(item)
             
@@ -59,14 +183,39 @@ class DynamoDBDocumentStorage:
             raise e
         
         
+    @timed("dynamodb")
     def delete_document(self, doc_id: str) -> str:
-        result = self.table.delete_item(
-            Key = {"doc_id" : doc_id}, 
-            ReturnValues="ALL_OLD"
-        )
-        return "Document deleted" if "Attributes" in result else "Document not found"
+        """
+        Delete a document by its ID.
+        The item is replaced by a tombstone so the change feed can report the delete.
+        """
+        change = self.next_change()
+        try:
+            self.write_table.update_item(
+                Key={"doc_id": doc_id},
+                UpdateExpression=(
+                    "SET deleted = :deleted, updated_at = :ua, #seq = :seq, feed = :feed "
+                    "REMOVE content, description"
+                ),
+                ConditionExpression="attribute_exists(doc_id) AND attribute_not_exists(deleted)",
+                ExpressionAttributeNames={"#seq": "sequence"},
+                ExpressionAttributeValues={
+                    ":deleted": True,
+                    ":ua": change["updated_at"],
+                    ":seq": change["sequence"],
+                    ":feed": change["feed"],
+                },
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return "Document not found"
+            raise e
+        # Reads that began before the delete must not be shared with later callers
+        self.read_flight.forget(doc_id)
+        return "Document deleted"
    
    
+    @timed("dynamodb")
     def update_document(self, doc_id: str, document: Document) -> Document | None:
         try:
             # Update all fields of the document
@@ -75,7 +224,10 @@ class DynamoDBDocumentStorage:
                 "description = :desc, "
                 "content = :content, "
                 "doc_page_count = :dpc, "
-                "isValid = :valid"
+                "isValid = :valid, "
+                "updated_at = :ua, "
+                "#seq = :seq, "
+                "feed = :feed"
                )
             expression_values = {
                 ":title": document.doc_title,
@@ -84,17 +236,116 @@ class DynamoDBDocumentStorage:
                 ":dpc": document.doc_page_count,
                 ":valid": document.isValid
             }
+            change = self.next_change()
+            expression_values.update({
+                ":ua": change["updated_at"],
+                ":seq": change["sequence"],
+                ":feed": change["feed"]
+            })
             
-            result = self.table.update_item(
+            result = self.write_table.update_item(
                 Key={"doc_id": doc_id},
                 UpdateExpression=update_expression,
+                ConditionExpression="attribute_exists(doc_id) AND attribute_not_exists(deleted)",
+                ExpressionAttributeNames={"#seq": "sequence"},
                 ExpressionAttributeValues=expression_values,
                 ReturnValues="ALL_NEW"
             )
+            # Reads that began before the update must not be shared with later callers
+            self.read_flight.forget(doc_id)
             updated_item = result.get("Attributes")
             if updated_item:
                 return Document.model_validate(updated_item)
             return None
         except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
             raise e
 
+    @timed("dynamodb")
+    def get_changes(self, since: int = 0, limit: int = 100) -> DocumentChangesPage:
+        """
+        Return up to `limit` changes with a sequence greater than `since`, oldest first.
+        Each document appears once with its latest state, so the cost follows churn.
+
+        Changes younger than CHANGE_FEED_SETTLE_SECONDS are held back, so a concurrent write
+        holding a lower sequence has time to land before a higher one is served. This is a
+        best-effort heuristic, not a guarantee: client timeouts do not bound the whole request,
+        a write DynamoDB already accepted can be applied after the client gave up, and GSI
+        propagation lag or clock skew between instances can exceed the window. A change that
+        lands that late is skipped by consumers whose cursor has already moved past it.
+        """
+        try:
+            response = self.table.query(
+                IndexName=self.change_feed_index,
+                KeyConditionExpression=Key("feed").eq(CHANGE_FEED_PARTITION) & Key("sequence").gt(since),
+                ScanIndexForward=True,
+                Limit=limit
+            )
+            settled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+            changes = []
+            has_more = "LastEvaluatedKey" in response
+            retry_after = None
+
+            for item in response['Items']:
+                # Stop at unsettled changes; a write holding a lower sequence may still land.
+                # Nothing more can be served until it settles, so tell the consumer when to come back
+                updated_at = datetime.fromisoformat(item["updated_at"])
+                if updated_at > settled_before:
+                    has_more = False
+                    retry_after = round((updated_at - settled_before).total_seconds(), 3)
+                    break
+                deleted = bool(item.get("deleted"))
+                changes.append(DocumentChange(
+                    doc_id=item["doc_id"],
+                    sequence=item["sequence"],
+                    updated_at=item["updated_at"],
+                    deleted=deleted,
+                    document=None if deleted else Document.model_validate(item)
+                ))
+
+            next_cursor = changes[-1].sequence if changes else since
+            return DocumentChangesPage(
+                changes=changes,
+                next_cursor=next_cursor,
+                has_more=has_more,
+                retry_after=retry_after
+            )
+        except ClientError as e:
+            raise e
+
+    def backfill_change_feed(self) -> int:
+        """
+        Stamp feed, sequence and updated_at on documents written before the change feed existed,
+        so a consumer starting from since=0 receives the full collection.
+        Returns the number of documents stamped.
+        """
+        stamped = 0
+        scan_kwargs = {"FilterExpression": Attr("feed").not_exists()}
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            for item in response['Items']:
+                if item["doc_id"] == SEQUENCE_COUNTER_ID:
+                    continue
+                change = self.next_change()
+                try:
+                    self.write_table.update_item(
+                        Key={"doc_id": item["doc_id"]},
+                        UpdateExpression="SET updated_at = :ua, #seq = :seq, feed = :feed",
+                        ConditionExpression="attribute_exists(doc_id) AND attribute_not_exists(feed)",
+                        ExpressionAttributeNames={"#seq": "sequence"},
+                        ExpressionAttributeValues={
+                            ":ua": change["updated_at"],
+                            ":seq": change["sequence"],
+                            ":feed": change["feed"],
+                        },
+                    )
+                    stamped += 1
+                except ClientError as e:
+                    # Written through the API since the scan, already in the feed
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise e
+
+            if "LastEvaluatedKey" not in response:
+                return stamped
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
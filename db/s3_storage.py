@@ -2,6 +2,7 @@ import boto3
 import json
 from typing import List, Optional
 from config import settings
+from timing import timed
 from modules.module import Document
 from exception.exceptions import (
     S3UploadError,
@@ -52,6 +53,7 @@ class S3Storage:
         except Exception as e:
             return False
     
+    @timed("s3")
     def create_document_s3(self, document: Document, format: str = "json") -> str:
         """
         Create a document in S3 with the specified format.
@@ -119,6 +121,7 @@ class S3Storage:
             details={'format': format}
         )
 
+    @timed("s3")
     def list_all_files(self) -> List[dict]:
         """
         Retrieve all document file information from S3.
@@ -145,6 +148,7 @@ class S3Storage:
                 details={'bucket': self.bucket_name}
             )
     
+    @timed("s3")
     def get_file_content(self, key: str) -> dict:
         """
         Download and return the content of a specific file from S3.
@@ -167,6 +171,7 @@ class S3Storage:
                 details={'bucket' : self.bucket_name}
             )
     
+    @timed("s3")
     def delete_file(self, key:str) -> bool:
         """
         Delete the file in s3
@@ -181,6 +186,7 @@ class S3Storage:
             )
             
                     
+    @timed("s3")
     def update_document(self, document: Document, Key:str):
         
         try:
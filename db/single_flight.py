@@ -0,0 +1,153 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+
+class _Call:
+    """An in-flight call whose result is shared with every waiter."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Set when the leader gave up without a result, waiters must retry
+        self.abandoned = False
+        # Futures of async waiters, resolved on their own event loop
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one backend call.
+    The first caller runs the function, later callers with the same key
+    wait for it and receive the same result or exception.
+    Threaded and async callers share the same in-flight calls.
+
+    Every caller receives the very same result object, not a copy,
+    so callers must treat it as read-only.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[Hashable, _Call] = {}
+        self.total_calls = 0
+        self.coalesced_calls = 0
+
+    def join(self, key: Hashable, retry: bool = False) -> Tuple[_Call, bool]:
+        """
+        Return the in-flight call for key, starting a new one if there is none.
+        The flag is True when the caller is the leader and must run the function.
+        Pass retry=True when rejoining after an abandoned call, so a caller is counted once.
+        """
+        with self.lock:
+            if not retry:
+                self.total_calls += 1
+            call = self.calls.get(key)
+            if call is not None:
+                if not retry:
+                    self.coalesced_calls += 1
+                return call, False
+            call = _Call()
+            self.calls[key] = call
+            return call, True
+
+    def finish(self, key: Hashable, call: _Call):
+        """Publish the outcome of call and wake everyone waiting on it."""
+        with self.lock:
+            if self.calls.get(key) is call:
+                del self.calls[key]
+            call.done.set()
+            waiters = call.async_waiters
+            call.async_waiters = []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn for key from a threaded handler, or join the call already in flight.
+        """
+        retry = False
+        while True:
+            call, leader = self.join(key, retry)
+            if leader:
+                return self.lead(key, call, fn)
+
+            call.done.wait()
+            if not call.abandoned:
+                return self.outcome(call)
+            retry = True
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run the coroutine function fn for key from an async handler,
+        or await the call already in flight.
+        """
+        retry = False
+        while True:
+            call, leader = self.join(key, retry)
+            if leader:
+                return await self.lead_async(key, call, fn)
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self.lock:
+                finished = call.done.is_set()
+                if not finished:
+                    call.async_waiters.append((loop, future))
+            if not finished:
+                await future
+            if not call.abandoned:
+                return self.outcome(call)
+            retry = True
+
+    def lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            self.finish(key, call)
+        return self.outcome(call)
+
+    async def lead_async(self, key: Hashable, call: _Call, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            call.result = await fn()
+        except Exception as e:
+            call.error = e
+        except BaseException:
+            # Cancelled leader: hand the key to a waiter instead of failing everyone
+            call.abandoned = True
+            raise
+        finally:
+            self.finish(key, call)
+        return self.outcome(call)
+
+    @staticmethod
+    def outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def forget(self, key: Hashable):
+        """
+        Stop handing out the in-flight result for key to new callers.
+        Called after a write so later reads do not join a call that began before it.
+        """
+        with self.lock:
+            self.calls.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return the call counters."""
+        with self.lock:
+            return {
+                "total_calls": self.total_calls,
+                "coalesced_calls": self.coalesced_calls,
+            }
@@ -0,0 +1 @@
+# This file makes middleware a Python package
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+
+class RouteLimiter:
+    """
+    Concurrency gate for a single route with a bounded wait queue.
+    Only touched from the event loop, so the counters need no locking.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue if there is room.
+        Returns False when the request should be shed.
+        """
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return True
+
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.semaphore.release()
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that caps in-flight requests per route.
+    Requests over the limit wait in a bounded queue and are rejected
+    with a 503 and Retry-After once the queue is full or the wait times out.
+    """
+
+    def __init__(
+        self,
+        app,
+        route_limits: Dict[str, Tuple[int, int]] = None,
+        default_limit: Tuple[int, int] = (16, 32),
+        queue_timeout: float = 2.0,
+        retry_after: int = 1,
+        exempt_paths: Iterable[str] = (),
+    ):
+        """
+        route_limits maps "METHOD /path/template" to (max_concurrency, max_queue).
+        Routes not listed there get their own limiter sized with default_limit.
+        """
+        self.app = app
+        self.route_limits = route_limits or {}
+        self.default_limit = default_limit
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.exempt_paths = set(exempt_paths)
+        self.limiters: Dict[str, RouteLimiter] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.get_limiter(scope)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service is busy, please retry later"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    def get_limiter(self, scope) -> Optional[RouteLimiter]:
+        """
+        Find the limiter for the route that will serve this request.
+        Unmatched paths are left alone so the router can return its 404/405.
+        """
+        route_key = self.resolve_route(scope)
+        if route_key is None:
+            return None
+
+        limiter = self.limiters.get(route_key)
+        if limiter is None:
+            max_concurrency, max_queue = self.route_limits.get(route_key, self.default_limit)
+            limiter = RouteLimiter(max_concurrency, max_queue, self.queue_timeout)
+            self.limiters[route_key] = limiter
+        return limiter
+
+    def resolve_route(self, scope) -> Optional[str]:
+        app = scope.get("app")
+        for route in getattr(app, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return f"{scope['method']} {route.path}"
+        return None
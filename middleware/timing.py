@@ -0,0 +1,239 @@
+import cProfile
+import functools
+import glob
+import inspect
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+
+from config import settings
+from timing import RequestTimings, request_timings
+
+# cProfile allows only one active profiler per process, so profiled requests take turns
+profiler_lock = threading.Lock()
+
+
+def prune_profiles(directory: str, max_files: int):
+    """Delete the oldest profiles so at most max_files are kept."""
+    profiles = sorted(glob.glob(os.path.join(directory, "*.prof")), key=os.path.getmtime)
+    for path in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def run_profiled(timings: RequestTimings, endpoint, *args, **kwargs):
+    """
+    Run a sync endpoint under cProfile and write the stats to the profiling directory.
+    Falls back to a plain call if another request is already being profiled.
+    """
+    if not profiler_lock.acquire(blocking=False):
+        timings.profile_status = "busy"
+        return endpoint(*args, **kwargs)
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(endpoint, *args, **kwargs)
+    finally:
+        profiler_lock.release()
+        try:
+            os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+            file_name = f"{int(time.time() * 1000)}-{endpoint.__name__}-{uuid.uuid4().hex[:8]}.prof"
+            profiler.dump_stats(os.path.join(settings.PROFILING_OUTPUT_DIR, file_name))
+            prune_profiles(settings.PROFILING_OUTPUT_DIR, settings.PROFILING_MAX_FILES)
+            timings.profile_status = "captured"
+        except Exception as e:
+            timings.profile_status = "failed"
+            print(f"Failed to write profile: {e}")
+
+
+def build_response(route: APIRoute, result):
+    """
+    Validate and render an endpoint result in the worker thread, the way FastAPI
+    would on the event loop, so large responses do not stall it.
+    Invalid results are returned unchanged so FastAPI reports the validation error as usual.
+    Endpoints that set headers or status through an injected Response only get validated
+    here, since a ready-built response would skip those.
+    """
+    field = route.response_field
+    if field is None or isinstance(result, Response):
+        return result
+    value, errors = field.validate(result, {}, loc=("response",))
+    if errors:
+        return result
+    if route.dependant.response_param_name or not is_body_allowed_for_status_code(route.status_code):
+        return value
+
+    content = field.serialize(
+        value,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    if route.status_code:
+        return response_class(content, status_code=route.status_code)
+    return response_class(content)
+
+
+def timed_endpoint(endpoint, route: APIRoute):
+    """
+    Wrap a route endpoint so the time around it can be split into request validation,
+    waiting for a threadpool worker and response serialization.
+    Sync endpoints are dispatched to the threadpool by the wrapper itself,
+    so the moment they are handed off can be recorded. Because the wrapper is a coroutine,
+    the response is validated and rendered in the worker thread to keep that work off the event loop.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            timings = request_timings.get()
+            if timings is None:
+                return await endpoint(*args, **kwargs)
+            if timings.profile:
+                # cProfile only sees its own thread, so event loop code is not profiled
+                timings.profile_status = "skipped"
+            timings.dispatch_start = timings.endpoint_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timings.endpoint_end = time.perf_counter()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timings = request_timings.get()
+        if timings is None:
+            return await run_in_threadpool(
+                lambda: build_response(route, endpoint(*args, **kwargs))
+            )
+
+        def run():
+            timings.endpoint_start = time.perf_counter()
+            try:
+                if timings.profile:
+                    result = run_profiled(timings, endpoint, *args, **kwargs)
+                else:
+                    result = endpoint(*args, **kwargs)
+            finally:
+                timings.endpoint_end = time.perf_counter()
+            return build_response(route, result)
+
+        timings.dispatch_start = time.perf_counter()
+        return await run_in_threadpool(run)
+    return wrapper
+
+
+def record_route_phases(timings: RequestTimings, start: float, end: float, responded: bool):
+    """
+    Split the route handler time into validation, queue and serialization.
+    Phases that were reached are recorded even when the request failed.
+    """
+    if timings.dispatch_start is None:
+        timings.add("validation", end - start)
+        return
+
+    timings.add("validation", timings.dispatch_start - start)
+    timings.add("queue", (timings.endpoint_start or end) - timings.dispatch_start)
+    if responded and timings.endpoint_end is not None:
+        timings.add("serialization", end - timings.endpoint_end)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that records request validation, threadpool wait and response serialization time.
+    Sync endpoints can also be run under the profiler.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint, self), **kwargs)
+
+    def get_route_handler(self):
+        route_handler = super().get_route_handler()
+
+        async def timed_route_handler(request):
+            timings = request_timings.get()
+            if timings is None:
+                return await route_handler(request)
+
+            start = time.perf_counter()
+            responded = False
+            try:
+                response = await route_handler(request)
+                responded = True
+                return response
+            finally:
+                record_route_phases(timings, start, time.perf_counter(), responded)
+
+        return timed_route_handler
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that adds a Server-Timing header to every response and
+    decides whether the request is profiled, either by header or by sampling.
+    Profiled responses carry X-Profile-Status: captured, busy, skipped or failed.
+
+    The profiling header lets any client trigger a profile, so only enable it
+    behind a trusted proxy that strips the header from outside requests.
+    """
+
+    def __init__(
+        self,
+        app,
+        profiling_sample_rate: float = 0.0,
+        profiling_header: Optional[str] = None,
+    ):
+        """
+        profiling_header is the request header that opts a request into profiling.
+        Leave it as None to only profile sampled requests.
+        """
+        self.app = app
+        self.profiling_sample_rate = profiling_sample_rate
+        self.profiling_header = profiling_header.lower().encode("latin-1") if profiling_header else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(profile=self.should_profile(scope))
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timings.add("total", time.perf_counter() - start)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header_value())
+                if timings.profile:
+                    headers.append("X-Profile-Status", timings.profile_status or "skipped")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+
+    def should_profile(self, scope) -> bool:
+        if self.profiling_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.profiling_header and value.lower() in (b"1", b"true"):
+                    return True
+        return self.profiling_sample_rate > 0 and random.random() < self.profiling_sample_rate
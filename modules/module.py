@@ -1,6 +1,6 @@
 import uuid
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class DocumentCreate(BaseModel):
@@ -20,4 +20,31 @@ class Document(DocumentCreate):
     """
     doc_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     s3_url: Optional[str] = None
+    updated_at: Optional[str] = None
+    sequence: Optional[int] = None
+
+
+class DocumentChange(BaseModel):
+    """
+    A single entry in the change feed.
+    Deleted documents are reported as tombstones without a document body.
+    """
+    doc_id: str
+    sequence: int
+    updated_at: str
+    deleted: bool = False
+    document: Optional[Document] = None
+
+
+class DocumentChangesPage(BaseModel):
+    """
+    A page of changes ordered by sequence.
+    Pass next_cursor as `since` to fetch the following page.
+    When has_more is false and retry_after is set, newer changes are still
+    settling and can be fetched after that many seconds.
+    """
+    changes: List[DocumentChange]
+    next_cursor: int
+    has_more: bool
+    retry_after: Optional[float] = None
     
\ No newline at end of file
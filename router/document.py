@@ -1,18 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List
 import json
-from modules.module import Document, DocumentCreate
+from modules.module import Document, DocumentCreate, DocumentChangesPage
 from db.dynamodb import DynamoDBDocumentStorage
 from config import settings
 from db.s3_storage import S3Storage
+from db.single_flight import SingleFlight
+from middleware.timing import TimedRoute
+from timing import measure
 
 router = APIRouter(
     prefix=settings.API_V1_PREFIX,
     tags=[settings.APPLICATION_TAG],
+    route_class=TimedRoute,
 )
 
 dynamodb_document_storage = DynamoDBDocumentStorage()
 s3_storage = S3Storage()
+document_list_flight = SingleFlight()
+
+DOCUMENT_LIST_KEY = "documents"
 
 @router.post("/documents/", response_model=Document, status_code=201)
 def create_document(
@@ -23,10 +30,12 @@ def create_document(
     Create a new document with auto-generated UUID.
     """
     try:
-        new_document = Document(**document.model_dump())
+        with measure("validation"):
+            new_document = Document(**document.model_dump())
         s3_result = s3_storage.create_document_s3(new_document, format=format)
         new_document.s3_url = s3_result
         dynamodb_document_storage.create_document(document=new_document)
+        document_list_flight.forget(DOCUMENT_LIST_KEY)
         return new_document
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create document: {str(e)}")
@@ -36,39 +45,62 @@ def create_document(
 def get_documents() -> List[Document]:
     """
     Retrieve all documents from S3.
-    Files are fetched and processed here.
+    Concurrent requests share a single listing and download pass.
     """ 
     try:
-        files = s3_storage.list_all_files()
-        documents = []
-        
-        for file in files:
-            try:
-                file_data = s3_storage.get_file_content(file['key'])
-                
-                if file_data['file_type'] == 'json':
+        return document_list_flight.do(DOCUMENT_LIST_KEY, load_documents_from_s3)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve documents: {str(e)}")
+
+
+def load_documents_from_s3() -> List[Document]:
+    """
+    List every document file in S3 and build Document objects from them.
+    Files are fetched and processed here.
+    """
+    files = s3_storage.list_all_files()
+    documents = []
+
+    for file in files:
+        try:
+            file_data = s3_storage.get_file_content(file['key'])
+            
+            if file_data['file_type'] == 'json':
+                with measure("validation"):
                     data = json.loads(file_data['content'])  
                     document = Document(**data)
-                    document.s3_url = file_data['key']
-                elif file_data['file_type'] in ['text']:
-                    document = Document(
-                        doc_id=file_data['key'].split('/')[-1],
-                        doc_title=f"Document from {file_data['key']}",
-                        content=file_data['content'],
-                        doc_page_count=0,
-                        isValid=True
-                    )
-                    document.s3_url = file_data['key']
-                    
-                documents.append(document)
-            except Exception as e:
-                print(f"Error processing file {file['key']}: {str(e)}")
-                continue
-        
-        return documents
-        
+                document.s3_url = file_data['key']
+            elif file_data['file_type'] in ['text']:
+                document = Document(
+                    doc_id=file_data['key'].split('/')[-1],
+                    doc_title=f"Document from {file_data['key']}",
+                    content=file_data['content'],
+                    doc_page_count=0,
+                    isValid=True
+                )
+                document.s3_url = file_data['key']
+                
+            documents.append(document)
+        except Exception as e:
+            print(f"Error processing file {file['key']}: {str(e)}")
+            continue
+    
+    return documents
+
+
+@router.get("/documents/changes", response_model=DocumentChangesPage)
+def get_document_changes(
+    since: int = Query(default=0, ge=0, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(default=100, ge=1, le=1000, description="Maximum number of changes to return")
+) -> DocumentChangesPage:
+    """
+    Retrieve documents created, updated or deleted after the given cursor.
+    Deleted documents are returned as tombstones.
+    """
+    try:
+        return dynamodb_document_storage.get_changes(since=since, limit=limit)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve document changes: {str(e)}")
 
 
 @router.get("/documents/{doc_id}", response_model=Document)
@@ -150,6 +182,7 @@ def update_document(doc_id: str, document: Document) -> Document:
             detail=f"Failed to update document in both storage systems: {str(s3_error)}"
         )
     
+    document_list_flight.forget(DOCUMENT_LIST_KEY)
     return updated
 
 
@@ -169,6 +202,7 @@ def delete_document(doc_id: str):
     try:
         if existing_doc.s3_url:
             s3_storage.delete_file(existing_doc.s3_url)
+            document_list_flight.forget(DOCUMENT_LIST_KEY)
     except Exception as s3_error:
         return {
             "warning": f"S3 cleanup failed: {str(s3_error)}"
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
-from router.document import router as document_router
+from router.document import router as document_router, dynamodb_document_storage, document_list_flight
+from middleware.admission import AdmissionControlMiddleware
+from middleware.timing import ServerTimingMiddleware
 from config import settings
 
 
@@ -11,6 +13,28 @@ app = FastAPI(
 
 app.include_router(document_router)
 
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        route_limits={
+            f"GET {settings.API_V1_PREFIX}/documents/": (
+                settings.DOCUMENT_LIST_MAX_CONCURRENCY,
+                settings.DOCUMENT_LIST_MAX_QUEUE,
+            ),
+        },
+        default_limit=(settings.DEFAULT_ROUTE_MAX_CONCURRENCY, settings.DEFAULT_ROUTE_MAX_QUEUE),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        exempt_paths=[settings.HEALTH_CHECK_ENDPOINT, settings.READINESS_CHECK_ENDPOINT],
+    )
+
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        profiling_sample_rate=settings.PROFILING_SAMPLE_RATE,
+        profiling_header=settings.PROFILING_HEADER if settings.PROFILING_HEADER_ENABLED else None,
+    )
+
 @app.get("/")
 def root():
     return {
@@ -18,14 +42,26 @@ def root():
         "version": settings.APP_VERSION,
         "docs": settings.DOCS_URL,
         "endpoints": {
-            "documents":f"{settings.API_V1_PREFIX}/{settings.APPLICATION_TAG}"
+            "documents":f"{settings.API_V1_PREFIX}/{settings.APPLICATION_TAG}",
+            "changes":f"{settings.API_V1_PREFIX}/{settings.APPLICATION_TAG}/changes"
         }
     }
 
+# Probes are async so they answer from the event loop even when every threadpool worker is busy
 @app.get(settings.HEALTH_CHECK_ENDPOINT)
-def health_check():
+async def health_check():
     return {"status": "healthy"}
 
+@app.get(settings.READINESS_CHECK_ENDPOINT)
+async def readiness_check():
+    return {
+        "status": "ready",
+        "coalescing": {
+            "document_reads": dynamodb_document_storage.read_flight.stats(),
+            "document_list": document_list_flight.stats()
+        }
+    }
+
 
 
 
@@ -0,0 +1,31 @@
+"""Helper for calling ASGI apps directly from tests without an HTTP client."""
+
+
+async def call(app, path: str, headers: list = None) -> dict:
+    """Send a GET request through the ASGI interface and collect the response status and headers."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers or [],
+        "client": ("testclient", 123),
+        "server": ("testserver", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    await app(scope, receive, send)
+    return response
@@ -0,0 +1,92 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from middleware.admission import AdmissionControlMiddleware, RouteLimiter
+from tests.asgi_client import call
+
+
+def make_app(release: asyncio.Event, **kwargs):
+    async def slow(request):
+        await release.wait()
+        return JSONResponse({"status": "done"})
+
+    async def health(request):
+        return JSONResponse({"status": "healthy"})
+
+    app = Starlette(routes=[Route("/documents/", slow), Route("/health", health)])
+    app.add_middleware(AdmissionControlMiddleware, **kwargs)
+    return app
+
+
+def test_route_limiter_sheds_when_queue_is_full():
+    async def scenario():
+        limiter = RouteLimiter(max_concurrency=1, max_queue=1, queue_timeout=5)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+
+        assert not await limiter.acquire()
+        assert limiter.rejected == 1
+
+        limiter.release()
+        assert await queued
+
+    asyncio.run(scenario())
+
+
+def test_route_limiter_sheds_after_queue_timeout():
+    async def scenario():
+        limiter = RouteLimiter(max_concurrency=1, max_queue=1, queue_timeout=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.rejected == 1
+        assert limiter.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_returns_503_with_retry_after():
+    async def scenario():
+        release = asyncio.Event()
+        app = make_app(
+            release,
+            route_limits={"GET /documents/": (1, 1)},
+            queue_timeout=5,
+            retry_after=3,
+            exempt_paths=["/health"],
+        )
+        running = asyncio.create_task(call(app, "/documents/"))
+        queued = asyncio.create_task(call(app, "/documents/"))
+        await asyncio.sleep(0.01)
+
+        rejected = await call(app, "/documents/")
+        assert rejected["status"] == 503
+        assert rejected["headers"][b"retry-after"] == b"3"
+
+        # Exempt paths are never held back by a busy route
+        assert (await call(app, "/health"))["status"] == 200
+
+        release.set()
+        assert (await running)["status"] == 200
+        assert (await queued)["status"] == 200
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_returns_503():
+    async def scenario():
+        release = asyncio.Event()
+        app = make_app(release, route_limits={"GET /documents/": (1, 1)}, queue_timeout=0.01)
+        running = asyncio.create_task(call(app, "/documents/"))
+        await asyncio.sleep(0.01)
+
+        assert (await call(app, "/documents/"))["status"] == 503
+
+        release.set()
+        assert (await running)["status"] == 200
+
+    asyncio.run(scenario())
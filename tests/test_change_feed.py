@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+from config import settings
+from db.dynamodb import DynamoDBDocumentStorage, SEQUENCE_COUNTER_ID, write_deadline_seconds
+
+
+class FakeTable:
+    """Minimal stand-in for a boto3 Table that records writes."""
+
+    def __init__(self, query_items=None, scan_pages=None):
+        self.query_items = query_items or []
+        self.scan_pages = scan_pages or []
+        self.sequence = 0
+        self.updates = []
+        self.last_evaluated_key = None
+
+    def query(self, **kwargs):
+        response = {"Items": self.query_items[:kwargs["Limit"]]}
+        if self.last_evaluated_key:
+            response["LastEvaluatedKey"] = self.last_evaluated_key
+        return response
+
+    def scan(self, **kwargs):
+        return self.scan_pages.pop(0)
+
+    def update_item(self, **kwargs):
+        if kwargs["Key"]["doc_id"] == SEQUENCE_COUNTER_ID:
+            self.sequence += 1
+            return {"Attributes": {"sequence": self.sequence}}
+        if kwargs["Key"]["doc_id"] == "raced":
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        self.updates.append(kwargs)
+        return {}
+
+
+def make_storage(table: FakeTable) -> DynamoDBDocumentStorage:
+    storage = DynamoDBDocumentStorage(auto_create_index=False)
+    storage.table = table
+    storage.write_table = table
+    return storage
+
+
+def feed_item(doc_id: str, sequence: int, age_seconds: float, deleted: bool = False) -> dict:
+    item = {
+        "doc_id": doc_id,
+        "sequence": sequence,
+        "updated_at": (datetime.now(timezone.utc) - timedelta(seconds=age_seconds)).isoformat(),
+        "feed": "documents",
+        "doc_title": doc_id,
+        "doc_page_count": 1,
+        "isValid": True,
+    }
+    if deleted:
+        item["deleted"] = True
+    return item
+
+
+def test_changes_stop_at_unsettled_writes():
+    settled = settings.CHANGE_FEED_SETTLE_SECONDS + 10
+    storage = make_storage(FakeTable(query_items=[
+        feed_item("a", 1, settled),
+        feed_item("b", 2, settled, deleted=True),
+        feed_item("c", 3, 0),
+    ]))
+
+    page = storage.get_changes(since=0, limit=10)
+
+    assert [change.sequence for change in page.changes] == [1, 2]
+    assert page.changes[0].document.doc_id == "a"
+    assert page.changes[1].deleted and page.changes[1].document is None
+    assert page.next_cursor == 2
+    # Nothing can be served until change 3 settles, so the consumer is told to wait instead of looping
+    assert not page.has_more
+    assert 0 < page.retry_after <= settings.CHANGE_FEED_SETTLE_SECONDS
+
+
+def test_only_unsettled_changes_do_not_spin():
+    storage = make_storage(FakeTable(query_items=[feed_item("a", 1, 0)]))
+    page = storage.get_changes(since=0, limit=10)
+    assert page.changes == []
+    assert page.next_cursor == 0
+    assert not page.has_more
+    assert page.retry_after is not None
+
+
+def test_full_settled_page_has_more():
+    settled = settings.CHANGE_FEED_SETTLE_SECONDS + 10
+    table = FakeTable(query_items=[feed_item("a", 1, settled), feed_item("b", 2, settled)])
+    table.last_evaluated_key = {"doc_id": "b"}
+    page = make_storage(table).get_changes(since=0, limit=2)
+    assert page.has_more
+    assert page.retry_after is None
+
+
+def test_empty_page_keeps_cursor():
+    storage = make_storage(FakeTable())
+    page = storage.get_changes(since=7, limit=10)
+    assert page.changes == []
+    assert page.next_cursor == 7
+    assert not page.has_more
+    assert page.retry_after is None
+
+
+def test_write_deadline_must_fit_in_settle_window(monkeypatch):
+    assert write_deadline_seconds(0.5, 1.0, 2) == 4.0
+    monkeypatch.setattr(settings, "DYNAMODB_WRITE_MAX_ATTEMPTS", 5)
+    with pytest.raises(ValueError):
+        DynamoDBDocumentStorage(auto_create_index=False)
+
+
+def test_backfill_stamps_documents_missing_from_feed():
+    table = FakeTable(scan_pages=[
+        {"Items": [{"doc_id": "a"}, {"doc_id": SEQUENCE_COUNTER_ID}], "LastEvaluatedKey": {"doc_id": "a"}},
+        {"Items": [{"doc_id": "raced"}, {"doc_id": "b"}]},
+    ])
+    storage = make_storage(table)
+
+    assert storage.backfill_change_feed() == 2
+    assert [update["Key"]["doc_id"] for update in table.updates] == ["a", "b"]
+    assert [update["ExpressionAttributeValues"][":seq"] for update in table.updates] == [1, 3]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+
+os.environ.setdefault("AWS_MAX_ATTEMPTS", "1")
+
+from fastapi import APIRouter, FastAPI
+
+import router.document as document_module
+from config import settings
+from middleware.timing import ServerTimingMiddleware, TimedRoute, prune_profiles
+from tests.asgi_client import call
+
+PROFILE_HEADER = [(b"x-profile", b"true")]
+
+
+class FakeS3Storage:
+    """Serves a single JSON document in place of S3."""
+
+    def list_all_files(self):
+        return [{"key": "documents/doc-1.json"}]
+
+    def get_file_content(self, key):
+        content = {"doc_id": "doc-1", "doc_title": "Doc", "doc_page_count": 1, "isValid": True}
+        return {"key": key, "content": json.dumps(content), "file_type": "json"}
+
+
+def make_app(*routers):
+    app = FastAPI()
+    for api_router in routers:
+        app.include_router(api_router)
+    app.add_middleware(ServerTimingMiddleware, profiling_header="X-Profile")
+    return app
+
+
+def test_document_listing_can_be_profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(document_module, "s3_storage", FakeS3Storage())
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    app = make_app(document_module.router)
+
+    response = asyncio.run(call(app, f"{settings.API_V1_PREFIX}/documents/", PROFILE_HEADER))
+
+    assert response["status"] == 200
+    assert response["headers"][b"x-profile-status"] == b"captured"
+    assert b"x-profile-file" not in response["headers"]
+    profiles = os.listdir(tmp_path)
+    assert len(profiles) == 1
+    assert "-get_documents-" in profiles[0] and profiles[0].endswith(".prof")
+
+
+def test_unprofiled_requests_do_not_report_status():
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/ping")
+    def ping():
+        return {"status": "ok"}
+
+    response = asyncio.run(call(make_app(router), "/ping"))
+    assert b"x-profile-status" not in response["headers"]
+
+
+def test_async_endpoints_report_profiling_skipped():
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    response = asyncio.run(call(make_app(router), "/ping", PROFILE_HEADER))
+    assert response["headers"][b"x-profile-status"] == b"skipped"
+
+
+def test_prune_profiles_keeps_the_newest(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"{i}.prof"
+        path.write_text("")
+        os.utime(path, (i, i))
+
+    prune_profiles(str(tmp_path), max_files=2)
+
+    assert sorted(os.listdir(tmp_path)) == ["3.prof", "4.prof"]
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from db.single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.1)
+        return "document"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("doc-1", load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["document"] * 8
+    assert flight.stats() == {"total_calls": 8, "coalesced_calls": 7}
+
+
+def test_error_is_shared_with_every_waiter():
+    flight = SingleFlight()
+    errors = []
+
+    def load():
+        time.sleep(0.1)
+        raise ValueError("backend down")
+
+    def read():
+        try:
+            flight.do("doc-1", load)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["backend down"] * 4
+    assert flight.stats()["coalesced_calls"] == 3
+
+
+def test_calls_after_completion_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("doc-1", lambda: 1) == 1
+    assert flight.do("doc-1", lambda: 2) == 2
+    assert flight.stats()["coalesced_calls"] == 0
+
+
+def test_forget_starts_a_new_call_for_later_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def slow_load():
+        started.set()
+        release.wait()
+        return "stale"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("doc-1", slow_load)))
+    leader.start()
+    started.wait()
+
+    flight.forget("doc-1")
+    assert flight.do("doc-1", lambda: "fresh") == "fresh"
+
+    release.set()
+    leader.join()
+    assert results == ["stale"]
+
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do_async("page-1", load) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == ["page"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"total_calls": 5, "coalesced_calls": 4}
+
+
+def test_async_caller_joins_threaded_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait()
+        return "shared"
+
+    leader = threading.Thread(target=lambda: flight.do("doc-1", slow_load))
+    leader.start()
+    started.wait()
+
+    async def scenario():
+        follower = asyncio.create_task(flight.do_async("doc-1", pytest.fail))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await follower
+
+    assert asyncio.run(scenario()) == "shared"
+    leader.join()
+    assert flight.stats()["coalesced_calls"] == 1
+
+
+def test_cancelled_leader_hands_off_to_follower():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do_async("page-1", load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("page-1", load))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "page"
+    assert len(calls) == 2
+    # The follower that took over is still counted once
+    assert flight.stats() == {"total_calls": 2, "coalesced_calls": 1}
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from anyio.to_thread import current_default_thread_limiter
+import threading
+
+from fastapi import APIRouter, FastAPI, HTTPException, Response
+from pydantic import BaseModel, field_validator
+
+from middleware.timing import ServerTimingMiddleware, TimedRoute
+from tests.asgi_client import call
+from timing import timed
+
+
+def make_app():
+    router = APIRouter(route_class=TimedRoute)
+
+    @timed("dynamodb")
+    def lookup():
+        time.sleep(0.01)
+
+    @router.get("/documents/{doc_id}")
+    def get_document(doc_id: str):
+        lookup()
+        if doc_id == "missing":
+            raise HTTPException(status_code=404, detail="Document not found")
+        time.sleep(0.2)
+        return {"doc_id": doc_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware)
+    return app
+
+
+def server_timing(response: dict) -> dict:
+    metrics = {}
+    for metric in response["headers"][b"server-timing"].decode().split(", "):
+        name, duration = metric.split(";dur=")
+        metrics[name] = float(duration)
+    return metrics
+
+
+def test_server_timing_reports_each_phase():
+    response = asyncio.run(call(make_app(), "/documents/doc-1"))
+    metrics = server_timing(response)
+
+    assert list(metrics) == ["dynamodb", "validation", "queue", "serialization", "total"]
+    assert metrics["dynamodb"] >= 10
+    assert metrics["total"] >= 200
+
+
+def test_threadpool_wait_is_reported_as_queue():
+    async def scenario():
+        current_default_thread_limiter().total_tokens = 1
+        app = make_app()
+        return await asyncio.gather(call(app, "/documents/doc-1"), call(app, "/documents/doc-2"))
+
+    metrics = [server_timing(response) for response in asyncio.run(scenario())]
+    waited = max(metrics, key=lambda m: m["queue"])
+
+    assert waited["queue"] >= 150
+    assert waited["validation"] < 50
+
+
+def test_failed_requests_keep_partial_phases():
+    response = asyncio.run(call(make_app(), "/documents/missing"))
+    metrics = server_timing(response)
+
+    assert response["status"] == 404
+    assert {"dynamodb", "validation", "queue", "total"} <= set(metrics)
+    assert "serialization" not in metrics
+
+
+def test_response_validation_stays_off_the_event_loop():
+    validated_on = set()
+
+    class Item(BaseModel):
+        name: str
+
+        @field_validator("name")
+        @classmethod
+        def record_thread(cls, value):
+            validated_on.add(threading.current_thread())
+            return value
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/items", response_model=list[Item])
+    def list_items():
+        return [{"name": f"item-{i}"} for i in range(1000)]
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware)
+
+    response = asyncio.run(call(app, "/items"))
+
+    assert response["status"] == 200
+    assert validated_on and threading.main_thread() not in validated_on
+
+
+def test_prebuilt_responses_keep_status_and_headers():
+    class Item(BaseModel):
+        name: str
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/created", response_model=Item, status_code=201)
+    def created():
+        return {"name": "new"}
+
+    @router.get("/tagged", response_model=Item)
+    def tagged(response: Response):
+        response.headers["X-Tag"] = "kept"
+        return {"name": "tagged"}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ServerTimingMiddleware)
+
+    assert asyncio.run(call(app, "/created"))["status"] == 201
+    assert asyncio.run(call(app, "/tagged"))["headers"][b"x-tag"] == b"kept"
+
+
+def test_storage_layer_does_not_import_web_framework():
+    check = "import sys, db.dynamodb, db.s3_storage; assert 'fastapi' not in sys.modules and 'middleware' not in sys.modules"
+    subprocess.run([sys.executable, "-c", check], check=True, env={**os.environ, "AWS_MAX_ATTEMPTS": "1"}, cwd=Path(__file__).parents[1], timeout=60)
@@ -0,0 +1,65 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Timings for the request being served, shared with the threadpool worker running its handler
+request_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Time spent in each phase of a single request, in seconds.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.lock = threading.Lock()
+        self.durations: Dict[str, float] = {}
+        self.profile = profile
+        self.profile_status: Optional[str] = None
+        # When the endpoint was handed to the threadpool, started and finished running
+        self.dispatch_start: Optional[float] = None
+        self.endpoint_start: Optional[float] = None
+        self.endpoint_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header_value(self) -> str:
+        """Format the durations as a Server-Timing header value in milliseconds."""
+        with self.lock:
+            return ", ".join(
+                f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()
+            )
+
+
+@contextmanager
+def measure(name: str):
+    """
+    Add the time spent inside the block to the current request under `name`.
+    Does nothing outside of a request.
+    """
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator that measures every call of a function under `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator